@@ -1,3 +1,4 @@
+import time
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException
@@ -35,12 +36,28 @@ class CFRefreshRequest(BaseModel):
     force: bool = False
 
 
+# 管理面板会定时轮询状态接口，短 TTL 缓存吸收重复请求
+_STATUS_TTL = 1.0
+_status_cache: tuple[float, CFStatusResponse] | None = None
+
+
+def _invalidate_status_cache() -> None:
+    global _status_cache
+    _status_cache = None
+
+
 @router.get("/status", response_model=CFStatusResponse)
 async def get_cf_status():
+    global _status_cache
+    now = time.monotonic()
+    cached = _status_cache
+    if cached and now - cached[0] < _STATUS_TTL:
+        return cached[1]
+
     facade = get_cf_credentials_facade()
     bundle = await facade.inspect()
 
-    return CFStatusResponse(
+    status = CFStatusResponse(
         enabled=bundle.has_dynamic_provider,
         selected_source=bundle.metadata.get("active_provider", bundle.source),
         providers=list(bundle.providers),
@@ -56,6 +73,8 @@ async def get_cf_status():
         cf_refresh_configured=bool(bundle.metadata.get("cf_refresh_configured", False)),
         cf_refresh_ready=bool(bundle.metadata.get("cf_refresh_ready", False)),
     )
+    _status_cache = (now, status)
+    return status
 
 
 @router.post("/refresh")
@@ -67,6 +86,7 @@ async def refresh_cf(request: CFRefreshRequest):
 
     logger.info(f"Manual CF credential refresh requested, force={request.force}")
     bundle = await facade.refresh(force=request.force)
+    _invalidate_status_cache()
 
     cf_refresh_triggered = bool(bundle.metadata.get("cf_refresh_triggered", False))
     cf_refresh_success = bundle.metadata.get("cf_refresh_success")
@@ -100,6 +120,7 @@ async def refresh_cf(request: CFRefreshRequest):
 async def invalidate_cf():
     facade = get_cf_credentials_facade()
     await facade.invalidate_dynamic_state(clear_cf_refresh_state=True)
+    _invalidate_status_cache()
 
     return {
         "success": True,
@@ -1,3 +1,12 @@
+"""Admin config routes.
+
+Handlers stay ``async def`` only while everything they call is awaitable or
+purely in-memory (config.update/load_config use async storage drivers,
+get_admin_view only copies dicts). A handler that needs a blocking call must
+either await an async equivalent or be declared ``def`` so FastAPI runs it in
+the threadpool.
+"""
+
 import os
 import re
 
@@ -10,6 +19,17 @@ from app.core.logger import logger
 
 router = APIRouter()
 
+_STORAGE_TYPE_MAP = {LocalStorage: "local", RedisStorage: "redis"}
+_SQL_DIALECT_MAP = {
+    "mysql": "mysql",
+    "mariadb": "mysql",
+    "postgres": "pgsql",
+    "postgresql": "pgsql",
+    "pgsql": "pgsql",
+}
+# 存储后端在进程生命周期内固定，首次请求时探测并缓存
+_storage_type: str | None = None
+
 _CFG_CHAR_REPLACEMENTS = str.maketrans(
     {
         "\u2010": "-",
@@ -109,22 +129,21 @@ async def update_config(data: dict):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _detect_storage_type() -> str:
+    storage_type = os.getenv("SERVER_STORAGE_TYPE", "").lower()
+    if storage_type:
+        return storage_type
+    storage = resolve_storage()
+    storage_type = _STORAGE_TYPE_MAP.get(type(storage))
+    if storage_type is None and isinstance(storage, SQLStorage):
+        storage_type = _SQL_DIALECT_MAP.get(storage.dialect, storage.dialect)
+    return storage_type or "local"
+
+
 @router.get("/storage", dependencies=[Depends(verify_app_key)])
 async def get_storage_mode():
     """获取当前存储模式"""
-    storage_type = os.getenv("SERVER_STORAGE_TYPE", "").lower()
-    if not storage_type:
-        storage = resolve_storage()
-        if isinstance(storage, LocalStorage):
-            storage_type = "local"
-        elif isinstance(storage, RedisStorage):
-            storage_type = "redis"
-        elif isinstance(storage, SQLStorage):
-            storage_type = {
-                "mysql": "mysql",
-                "mariadb": "mysql",
-                "postgres": "pgsql",
-                "postgresql": "pgsql",
-                "pgsql": "pgsql",
-            }.get(storage.dialect, storage.dialect)
-    return {"type": storage_type or "local"}
+    global _storage_type
+    if _storage_type is None:
+        _storage_type = _detect_storage_type()
+    return {"type": _storage_type}
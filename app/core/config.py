@@ -242,6 +242,8 @@ class Config:
         self._env_locked_paths: Dict[str, str] = {}
         self._env_overlay = EnvConfigOverlay()
         self._defaults_loaded = False
+        # 运行时配置每次变更递增，供调用方判断本地缓存是否失效
+        self.generation = 0
 
     def register_defaults(self, defaults: Dict[str, Any]):
         """注册代码中定义的默认值"""
@@ -265,6 +267,7 @@ class Config:
         self._persisted_config = _deep_merge({}, persisted_config)
         self._env_locked_paths = dict(overlay_result.locked_paths)
         self._config = _deep_merge(self._persisted_config, overlay_result.overrides)
+        self.generation += 1
 
     def get_admin_view(self) -> Dict[str, Any]:
         """返回管理面板使用的配置与锁定元信息。"""
@@ -359,6 +362,7 @@ class Config:
             self._config = {}
             self._persisted_config = {}
             self._env_locked_paths = {}
+            self.generation += 1
 
     def get(self, key: str, default: Any = None) -> Any:
         """
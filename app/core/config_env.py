@@ -11,19 +11,32 @@ from __future__ import annotations
 
 from copy import deepcopy
 from dataclasses import dataclass, field
+from functools import lru_cache
 import json
 import os
 import re
 from typing import Any, Dict, Mapping, Sequence
 
 DEFAULT_ENV_PREFIX = "GROK2API_CONFIG__"
-_TRUE_VALUES = {"1", "true", "yes", "y", "on"}
-_FALSE_VALUES = {"0", "false", "no", "n", "off"}
+_TRUE_VALUES = frozenset({"1", "true", "yes", "y", "on"})
+_FALSE_VALUES = frozenset({"0", "false", "no", "n", "off"})
+# 预置常见大小写写法，命中时一次查表即可，无需 lower()
+_BOOL_VALUES = {
+    variant: flag
+    for values, flag in ((_TRUE_VALUES, True), (_FALSE_VALUES, False))
+    for value in values
+    for variant in (value, value.upper(), value.capitalize())
+}
 _ENV_SEGMENT_PATTERN = re.compile(r"[^A-Z0-9]+")
 _LEGACY_PATH_ALIASES = {
     "app.function_enabled": ["app.public_enabled"],
     "app.function_key": ["app.public_key"],
 }
+# 内部统一使用 tuple 路径，仅在对外接口处转换为 "section.key" 字符串
+_LEGACY_SEGMENT_ALIASES = {
+    tuple(path.split(".")): [tuple(alias.split(".")) for alias in aliases]
+    for path, aliases in _LEGACY_PATH_ALIASES.items()
+}
 
 
 @dataclass
@@ -43,48 +56,84 @@ class EnvConfigOverlay:
     ):
         self.prefix = prefix
         self._environ = os.environ if environ is None else environ
+        self._defaults_ref: Dict[str, Any] | None = None
+        self._templates: Dict[tuple[str, ...], Any] = {}
 
     def build(self, defaults: Dict[str, Any], baseline: Dict[str, Any]) -> EnvOverrideResult:
-        templates = _flatten_dict(defaults or {})
+        templates = self._flatten_defaults(defaults or {})
         baseline_values = _flatten_dict(baseline or {})
-        paths = sorted(set(templates.keys()) | set(baseline_values.keys()))
-
-        result = EnvOverrideResult()
-        for path in paths:
-            env_var = self._resolve_env_var(path)
-            if not env_var:
+        env_index = _build_env_index(
+            self.prefix, frozenset(templates.keys() | baseline_values.keys())
+        )
+
+        # 只遍历带前缀的环境变量；同一路径命中多个变量时取优先级最高（rank 最小）的
+        matched: Dict[tuple[str, ...], tuple[int, str, str]] = {}
+        for env_var, raw_value in self._environ.items():
+            if not env_var.startswith(self.prefix):
                 continue
+            for rank, path in env_index.get(env_var, ()):
+                current = matched.get(path)
+                if current is None or rank < current[0]:
+                    matched[path] = (rank, env_var, raw_value)
 
+        result = EnvOverrideResult()
+        for path in sorted(matched):
+            _, env_var, raw_value = matched[path]
             template = templates.get(path, baseline_values.get(path))
-            raw_value = self._environ.get(env_var, "")
+            dotted = ".".join(path)
             try:
                 parsed = _parse_value(raw_value, template)
             except ValueError as exc:
-                result.errors[path] = f"{env_var}: {exc}"
+                result.errors[dotted] = f"{env_var}: {exc}"
                 continue
 
-            _set_by_path(result.overrides, path.split("."), parsed)
-            result.locked_paths[path] = env_var
+            _set_by_path(result.overrides, path, parsed)
+            result.locked_paths[dotted] = env_var
 
         return result
 
-    def _resolve_env_var(self, path: str) -> str | None:
-        candidates = [path, *_LEGACY_PATH_ALIASES.get(path, [])]
-        for candidate in candidates:
-            env_var = self.path_to_env_var(candidate)
-            if env_var in self._environ:
-                return env_var
-        return None
+    def _flatten_defaults(self, defaults: Dict[str, Any]) -> Dict[tuple[str, ...], Any]:
+        # 默认配置加载后不再原地修改，按对象身份缓存展开结果，避免每次重载重复展开
+        if defaults is not self._defaults_ref:
+            self._templates = _flatten_dict(defaults)
+            self._defaults_ref = defaults
+        return self._templates
 
     def path_to_env_var(self, path: str) -> str:
-        segments = [seg for seg in path.split(".") if seg]
-        normalized = [self._normalize_segment(seg) for seg in segments]
-        return self.prefix + "__".join(normalized)
+        return _path_to_env_var(self.prefix, path)
 
     @staticmethod
     def _normalize_segment(segment: str) -> str:
-        cleaned = _ENV_SEGMENT_PATTERN.sub("_", segment.upper()).strip("_")
-        return cleaned or "UNKNOWN"
+        return _normalize_segment(segment)
+
+
+@lru_cache(maxsize=4096)
+def _normalize_segment(segment: str) -> str:
+    cleaned = _ENV_SEGMENT_PATTERN.sub("_", segment.upper()).strip("_")
+    return cleaned or "UNKNOWN"
+
+
+@lru_cache(maxsize=4096)
+def _segments_to_env_var(prefix: str, segments: tuple[str, ...]) -> str:
+    # 配置结构在进程生命周期内基本稳定，按 (prefix, segments) 缓存映射结果
+    return prefix + "__".join(_normalize_segment(seg) for seg in segments if seg)
+
+
+def _path_to_env_var(prefix: str, path: str) -> str:
+    return _segments_to_env_var(prefix, tuple(path.split(".")))
+
+
+@lru_cache(maxsize=8)
+def _build_env_index(
+    prefix: str, paths: frozenset[tuple[str, ...]]
+) -> Dict[str, tuple[tuple[int, tuple[str, ...]], ...]]:
+    """构建 环境变量名 -> ((优先级, 配置路径), ...) 的反向索引，路径本身优先于旧别名。"""
+    index: Dict[str, list[tuple[int, tuple[str, ...]]]] = {}
+    for path in paths:
+        candidates = [path, *_LEGACY_SEGMENT_ALIASES.get(path, [])]
+        for rank, candidate in enumerate(candidates):
+            index.setdefault(_segments_to_env_var(prefix, candidate), []).append((rank, path))
+    return {env_var: tuple(entries) for env_var, entries in index.items()}
 
 
 def filter_locked_config(
@@ -95,7 +144,7 @@ def filter_locked_config(
     if not isinstance(new_config, dict):
         return {}, []
 
-    locked = set(locked_paths.keys()) if isinstance(locked_paths, Mapping) else set(locked_paths)
+    locked = {tuple(path.split(".")) for path in locked_paths}
     flat_new = _flatten_dict(new_config)
 
     filtered: Dict[str, Any] = {}
@@ -103,29 +152,50 @@ def filter_locked_config(
 
     for path, value in flat_new.items():
         if path in locked:
-            ignored.append(path)
+            ignored.append(".".join(path))
             continue
-        _set_by_path(filtered, path.split("."), deepcopy(value))
+        _set_by_path(filtered, path, _safe_copy(value))
 
     return filtered, sorted(ignored)
 
 
-def _flatten_dict(data: Dict[str, Any], parent: Sequence[str] | None = None) -> Dict[str, Any]:
+def _flatten_dict(
+    data: Dict[str, Any], parent: Sequence[str] | None = None
+) -> Dict[tuple[str, ...], Any]:
     if not isinstance(data, dict):
         return {}
 
-    parent_path = list(parent or [])
-    out: Dict[str, Any] = {}
-    for key, value in data.items():
-        key_str = str(key)
-        current = [*parent_path, key_str]
-        if isinstance(value, dict):
-            out.update(_flatten_dict(value, current))
+    # 显式栈代替递归，保持原有遍历顺序
+    out: Dict[tuple[str, ...], Any] = {}
+    stack = [(tuple(parent or ()), iter(data.items()))]
+    while stack:
+        prefix, items = stack[-1]
+        for key, value in items:
+            path = (*prefix, str(key))
+            if isinstance(value, dict):
+                stack.append((path, iter(value.items())))
+                break
+            out[path] = value
         else:
-            out[".".join(current)] = value
+            stack.pop()
     return out
 
 
+_IMMUTABLE_TYPES = frozenset({str, int, float, bool, type(None)})
+
+
+def _safe_copy(value: Any) -> Any:
+    """按类型复制 JSON 风格的值：标量直接返回，list/dict 逐层重建，其余回退 deepcopy。"""
+    value_type = type(value)
+    if value_type in _IMMUTABLE_TYPES:
+        return value
+    if value_type is list:
+        return [_safe_copy(item) for item in value]
+    if value_type is dict:
+        return {key: _safe_copy(item) for key, item in value.items()}
+    return deepcopy(value)
+
+
 def _set_by_path(target: Dict[str, Any], segments: Sequence[str], value: Any):
     if not segments:
         return
@@ -139,49 +209,75 @@ def _set_by_path(target: Dict[str, Any], segments: Sequence[str], value: Any):
     cursor[segments[-1]] = value
 
 
-def _parse_value(raw: str, template: Any) -> Any:
+def _parse_bool(raw: str) -> bool:
     text = raw.strip()
+    value = _BOOL_VALUES.get(text)
+    if value is None:
+        value = _BOOL_VALUES.get(text.lower())
+    if value is not None:
+        return value
+    raise ValueError("布尔值仅支持 true/false/1/0/yes/no/on/off")
 
-    if isinstance(template, bool):
-        lowered = text.lower()
-        if lowered in _TRUE_VALUES:
-            return True
-        if lowered in _FALSE_VALUES:
-            return False
-        raise ValueError("布尔值仅支持 true/false/1/0/yes/no/on/off")
-
-    if isinstance(template, int) and not isinstance(template, bool):
-        try:
-            return int(text)
-        except ValueError as exc:
-            raise ValueError("应为整数") from exc
-
-    if isinstance(template, float):
-        try:
-            return float(text)
-        except ValueError as exc:
-            raise ValueError("应为数字") from exc
-
-    if isinstance(template, list):
-        parsed = _parse_json_value(text)
-        if isinstance(parsed, list):
-            return parsed
-        if text == "":
-            return []
-        return [item.strip() for item in text.split(",") if item.strip()]
-
-    if isinstance(template, dict):
-        parsed = _parse_json_value(text)
-        if isinstance(parsed, dict):
-            return parsed
-        raise ValueError("应为 JSON 对象")
-
-    return raw
+
+def _parse_int(raw: str) -> int:
+    try:
+        return int(raw.strip())
+    except ValueError as exc:
+        raise ValueError("应为整数") from exc
+
+
+def _parse_float(raw: str) -> float:
+    try:
+        return float(raw.strip())
+    except ValueError as exc:
+        raise ValueError("应为数字") from exc
+
+
+def _parse_list(raw: str) -> list:
+    text = raw.strip()
+    parsed = _parse_json_value(text)
+    if isinstance(parsed, list):
+        return parsed
+    if text == "":
+        return []
+    return [item.strip() for item in text.split(",") if item.strip()]
+
+
+def _parse_dict(raw: str) -> dict:
+    parsed = _parse_json_value(raw.strip())
+    if isinstance(parsed, dict):
+        return parsed
+    raise ValueError("应为 JSON 对象")
+
+
+# 模板值来自 TOML/JSON，类型精确，按 type() 一次查表选出解析器；
+# 字符串配置（URL、密钥、代理等）及其他类型原样返回
+_VALUE_PARSERS = {
+    bool: _parse_bool,
+    int: _parse_int,
+    float: _parse_float,
+    list: _parse_list,
+    dict: _parse_dict,
+}
+
+
+def _parse_value(raw: str, template: Any) -> Any:
+    parser = _VALUE_PARSERS.get(type(template))
+    if parser is None:
+        return raw
+    return parser(raw)
+
+
+_JSON_START_CHARS = frozenset('[{"-0123456789tfn')
 
 
 def _parse_json_value(raw: str) -> Any:
+    # 首字符不可能构成 JSON 时（如 "a,b,c" 形式的列表）直接跳过，避免异常开销
+    text = raw.lstrip()
+    if not text or text[0] not in _JSON_START_CHARS:
+        return None
     try:
-        return json.loads(raw)
+        return json.loads(text)
     except Exception:
         return None
 
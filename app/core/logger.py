@@ -9,9 +9,20 @@ import traceback
 from pathlib import Path
 from loguru import logger
 
+# setup_logging 配置的最低级别；未配置前不做过滤
+_MIN_LEVEL_NO = 0
+
+
+def _is_enabled_for(level) -> bool:
+    """按已配置的最低级别判断，数值与标准库 logging 级别一致（DEBUG=10）。"""
+    if not isinstance(level, int):
+        level = logger.level(str(level).upper()).no
+    return level >= _MIN_LEVEL_NO
+
+
 # Provide logging.Logger compatibility for legacy calls
 if not hasattr(logger, "isEnabledFor"):
-    logger.isEnabledFor = lambda _level: True
+    logger.isEnabledFor = _is_enabled_for
 
 # 日志目录
 DEFAULT_LOG_DIR = Path(__file__).parent.parent.parent / "logs"
@@ -104,7 +115,9 @@ def setup_logging(
     file_logging: bool = True,
 ):
     """设置日志配置"""
+    global _MIN_LEVEL_NO
     logger.remove()
+    _MIN_LEVEL_NO = level if isinstance(level, int) else logger.level(level.upper()).no
     file_logging = _env_flag("LOG_FILE_ENABLED", file_logging)
 
     # 控制台输出
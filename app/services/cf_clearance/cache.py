@@ -6,13 +6,15 @@ CF Clearance 缓存管理
 
 import time
 import asyncio
-from typing import Optional, Dict
-from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional, Dict
+from dataclasses import dataclass, field
 
 from app.core.logger import logger
 
+_DEFAULT_EXPIRE_BUFFER = 300
 
-@dataclass
+
+@dataclass(slots=True, frozen=True)
 class CFClearanceCache:
     cf_clearance: str
     user_agent: str
@@ -21,10 +23,18 @@ class CFClearanceCache:
     expires_at: float
     cookie_string: Optional[str] = None
     cookies: Optional[Dict[str, str]] = None
+    _expire_threshold: float = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self) -> None:
+        # expires_at 是服务端返回的墙钟时间戳，预先减去默认缓冲期
+        threshold = self.expires_at - _DEFAULT_EXPIRE_BUFFER if self.expires_at else 0.0
+        object.__setattr__(self, "_expire_threshold", threshold)
     
-    def is_expired(self, buffer_seconds: int = 300) -> bool:
+    def is_expired(self, buffer_seconds: int = _DEFAULT_EXPIRE_BUFFER) -> bool:
         if not self.expires_at:
             return True
+        if buffer_seconds == _DEFAULT_EXPIRE_BUFFER:
+            return time.time() >= self._expire_threshold
         return time.time() >= (self.expires_at - buffer_seconds)
     
     def is_valid_for(self, browser: str, proxy: Optional[str]) -> bool:
@@ -44,27 +54,31 @@ class CFClearanceCacheManager:
         self._cache: Optional[CFClearanceCache] = None
         self._lock = asyncio.Lock()
         self._refreshing = False
+        self._inflight: Optional[asyncio.Future] = None
     
     async def get_cached(
         self, 
         browser: str, 
         proxy: Optional[str]
     ) -> Optional[CFClearanceCache]:
-        async with self._lock:
-            if self._cache and self._cache.is_valid_for(browser, proxy):
-                logger.debug(
-                    f"CF Clearance cache hit: browser={browser}, "
-                    f"expires_in={int(self._cache.expires_at - time.time())}s"
-                )
-                return self._cache
-            return None
+        # 缓存对象不可变，读取只是一次引用加载，无需加锁；仅写路径持锁
+        cache = self._cache
+        if cache and cache.is_valid_for(browser, proxy):
+            logger.debug(
+                f"CF Clearance cache hit: browser={browser}, "
+                f"expires_in={int(cache.expires_at - time.time())}s"
+            )
+            return cache
+        return None
     
     async def set_cache(self, cache: CFClearanceCache) -> None:
         async with self._lock:
             self._cache = cache
-            logger.info(
-                f"CF Clearance cached: browser={cache.browser}, "
-                f"expires_at={time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(cache.expires_at))}"
+            # 仅当 INFO 日志实际输出时才格式化过期时间
+            logger.opt(lazy=True).info(
+                "CF Clearance cached: browser={}, expires_at={}",
+                lambda: cache.browser,
+                lambda: time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(cache.expires_at)),
             )
     
     async def invalidate(self) -> None:
@@ -73,12 +87,45 @@ class CFClearanceCacheManager:
             logger.info("CF Clearance cache invalidated")
     
     async def is_refreshing(self) -> bool:
-        async with self._lock:
-            return self._refreshing
+        return self._refreshing
     
     async def set_refreshing(self, value: bool) -> None:
-        async with self._lock:
-            self._refreshing = value
+        self._refreshing = value
+
+    async def get_or_fetch(
+        self,
+        browser: str,
+        proxy: Optional[str],
+        fetch: Callable[[], Awaitable[Optional[CFClearanceCache]]],
+        timeout: float = 30,
+    ) -> Optional[CFClearanceCache]:
+        """单飞刷新：并发调用共享同一次 fetch，其余调用等待其结果。"""
+        loop = asyncio.get_running_loop()
+        inflight = self._inflight
+        # Future 绑定创建它的事件循环；来自其他循环（同步桥接线程）的调用独立刷新
+        if inflight is not None and inflight.get_loop() is loop:
+            logger.debug("CF Clearance refresh already in progress, waiting...")
+            try:
+                await asyncio.wait_for(asyncio.shield(inflight), timeout=timeout)
+            except asyncio.TimeoutError:
+                return None
+            return await self.get_cached(browser, proxy)
+
+        future = loop.create_future()
+        self._inflight = future
+        self._refreshing = True
+        try:
+            cache = await fetch()
+            if cache:
+                await self.set_cache(cache)
+            return cache
+        finally:
+            # 先写缓存再唤醒等待方，避免等待方读到旧状态
+            if not future.done():
+                future.set_result(None)
+            if self._inflight is future:
+                self._inflight = None
+                self._refreshing = False
 
 
 _cache_manager: Optional[CFClearanceCacheManager] = None
@@ -4,11 +4,12 @@ CF Clearance 自动获取服务
 通过 cf-credential-service 自动获取 CF Clearance。
 """
 
+import asyncio
 import httpx
 from typing import Optional, Dict, Any
 
 from app.core.logger import logger
-from app.core.config import get_config
+from app.core.config import config, get_config
 from app.services.cf_clearance.cache import (
     CFClearanceCache, 
     get_cache_manager
@@ -20,33 +21,142 @@ class CFClearanceService:
     
     def __init__(self):
         self._cache_manager = get_cache_manager()
+        self._cfg_gen = -1
+        self._service_url: Optional[str] = None
+        self._api_key: Optional[str] = None
+        self._target_url = "https://grok.com"
+        self._timeout = 120
+        self._proxy: Optional[str] = None
+        self._browser = "chrome136"
+        self._user_agent: Optional[str] = None
+        self._request_url: Optional[str] = None
+        self._request_headers: Dict[str, str] = {}
+        self._base_context_args: tuple = ()
+        self._base_context: Dict[str, Any] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    def _refresh_cfg(self) -> None:
+        """配置变更后一次性读取所有相关配置项。"""
+        self._service_url = get_config("cf_clearance.service_url")
+        self._api_key = get_config("cf_clearance.api_key")
+        self._target_url = get_config("cf_clearance.target_url", "https://grok.com")
+        self._timeout = get_config("cf_clearance.timeout", 120)
+        self._proxy = get_config("proxy.base_proxy_url")
+        self._browser = get_config("proxy.browser", "chrome136")
+        self._user_agent = get_config("proxy.user_agent")
+
+        # 请求 URL / 请求头 / 默认 context 仅随配置变化，按配置版本预先组装
+        self._request_url = (
+            f"{self._service_url.rstrip('/')}/api/v1/credentials"
+            if self._service_url
+            else None
+        )
+        self._request_headers = {"Content-Type": "application/json"}
+        if self._api_key:
+            self._request_headers["X-API-Key"] = self._api_key
+        self._base_context_args = (
+            self._browser,
+            self._proxy,
+            self._user_agent,
+            self._timeout,
+        )
+        self._base_context = self._build_context(*self._base_context_args)
+        self._cfg_gen = config.generation
+        logger.debug(
+            f"CF Clearance service enabled: {bool(self._service_url)}, url: {self._service_url}"
+        )
+    
+    @staticmethod
+    def _build_context(
+        browser: str,
+        proxy: Optional[str],
+        user_agent: Optional[str],
+        timeout: Optional[int],
+    ) -> Dict[str, Any]:
+        context: Dict[str, Any] = {
+            "browser": browser,
+        }
+        
+        if proxy:
+            context["proxy"] = proxy
+        
+        if user_agent:
+            context["user_agent"] = user_agent
+        
+        if timeout:
+            context["timeout"] = timeout
+        
+        return context
+    
+    def _ensure_cfg(self) -> None:
+        if self._cfg_gen != config.generation:
+            self._refresh_cfg()
     
     def _get_service_url(self) -> Optional[str]:
-        return get_config("cf_clearance.service_url")
+        self._ensure_cfg()
+        return self._service_url
     
     def _get_api_key(self) -> Optional[str]:
-        return get_config("cf_clearance.api_key")
+        self._ensure_cfg()
+        return self._api_key
     
     def _get_target_url(self) -> str:
-        return get_config("cf_clearance.target_url", "https://grok.com")
+        self._ensure_cfg()
+        return self._target_url
     
     def _get_timeout(self) -> int:
-        return get_config("cf_clearance.timeout", 120)
+        self._ensure_cfg()
+        return self._timeout
     
     def _get_proxy(self) -> Optional[str]:
-        return get_config("proxy.base_proxy_url")
+        self._ensure_cfg()
+        return self._proxy
     
     def _get_browser(self) -> str:
-        return get_config("proxy.browser", "chrome136")
+        self._ensure_cfg()
+        return self._browser
     
     def _get_user_agent(self) -> Optional[str]:
-        return get_config("proxy.user_agent")
+        self._ensure_cfg()
+        return self._user_agent
+    
+    def _get_client(self) -> Optional[httpx.AsyncClient]:
+        """返回可复用的 AsyncClient；非所属事件循环（如同步桥接线程）返回 None。"""
+        loop = asyncio.get_running_loop()
+        if (
+            self._client is None
+            or self._client.is_closed
+            or self._client_loop is None
+            or self._client_loop.is_closed()
+        ):
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(max_keepalive_connections=4, keepalive_expiry=60)
+            )
+            self._client_loop = loop
+        if self._client_loop is not loop:
+            return None
+        return self._client
+    
+    async def _post(
+        self, url: str, payload: Dict[str, Any], headers: Dict[str, str], timeout: int
+    ) -> httpx.Response:
+        client = self._get_client()
+        if client is None:
+            async with httpx.AsyncClient(timeout=timeout + 10) as temp_client:
+                return await temp_client.post(url, json=payload, headers=headers)
+        return await client.post(url, json=payload, headers=headers, timeout=timeout + 10)
+    
+    async def aclose(self) -> None:
+        client = self._client
+        self._client = None
+        self._client_loop = None
+        if client is not None and not client.is_closed:
+            await client.aclose()
     
     def is_enabled(self) -> bool:
-        service_url = self._get_service_url()
-        enabled = bool(service_url)
-        logger.debug(f"CF Clearance service enabled: {enabled}, url: {service_url}")
-        return enabled
+        # 状态仅随配置变化，已在 _refresh_cfg 中记录日志
+        return bool(self._get_service_url())
     
     async def fetch_from_service(
         self,
@@ -55,98 +165,79 @@ class CFClearanceService:
         user_agent: Optional[str] = None,
         timeout: Optional[int] = None
     ) -> Optional[CFClearanceCache]:
-        service_url = self._get_service_url()
-        if not service_url:
+        self._ensure_cfg()
+        full_url = self._request_url
+        if not full_url:
             logger.warning("CF Clearance service URL not configured")
             return None
         
-        api_key = self._get_api_key()
-        target_url = self._get_target_url()
-        
-        browser = browser or self._get_browser()
-        proxy = proxy if proxy is not None else self._get_proxy()
-        user_agent = user_agent or self._get_user_agent()
-        timeout = timeout or self._get_timeout()
-        
-        context: Dict[str, Any] = {
-            "browser": browser,
-        }
-        
-        if proxy:
-            context["proxy"] = proxy
-        
-        if user_agent:
-            context["user_agent"] = user_agent
+        browser = browser or self._browser
+        proxy = proxy if proxy is not None else self._proxy
+        user_agent = user_agent or self._user_agent
+        timeout = timeout or self._timeout
         
-        if timeout:
-            context["timeout"] = timeout
+        args = (browser, proxy, user_agent, timeout)
+        if args == self._base_context_args:
+            context = dict(self._base_context)
+        else:
+            context = self._build_context(*args)
         
         payload = {
-            "target_url": target_url,
+            "target_url": self._target_url,
             "context": context
         }
-        
-        headers = {"Content-Type": "application/json"}
-        if api_key:
-            headers["X-API-Key"] = api_key
-        
-        full_url = f"{service_url.rstrip('/')}/api/v1/credentials"
+        headers = self._request_headers
         
         logger.info(f"Requesting CF Clearance from: {full_url}")
         logger.debug(f"CF Clearance request payload: browser={browser}, proxy={'***' if proxy else None}, timeout={timeout}")
         
         try:
-            async with httpx.AsyncClient(timeout=timeout + 10) as client:
-                response = await client.post(
-                    full_url,
-                    json=payload,
-                    headers=headers
+            response = await self._post(full_url, payload, headers, timeout)
+            
+            logger.info(f"CF Clearance service response: {response.status_code}")
+            
+            if response.status_code != 200:
+                logger.error(
+                    f"CF Clearance service returned {response.status_code}: "
+                    f"{response.text[:500]}"
                 )
-                
-                logger.info(f"CF Clearance service response: {response.status_code}")
-                
-                if response.status_code != 200:
-                    logger.error(
-                        f"CF Clearance service returned {response.status_code}: "
-                        f"{response.text[:500]}"
-                    )
-                    return None
-                
-                data = response.json()
-                
-                if not data.get("success"):
-                    error = data.get("error", "Unknown error")
-                    logger.error(f"CF Clearance service failed: {error}")
-                    return None
-                
-                cf_clearance_value = data.get("cf_clearance") or ""
-                
-                if not cf_clearance_value:
-                    challenge_type = data.get("challenge_type", "unknown")
-                    logger.warning(
-                        f"CF Clearance not obtained: challenge_type={challenge_type}, "
-                        f"target may not have CF protection"
-                    )
-                    return None
-                
-                cache = CFClearanceCache(
-                    cf_clearance=cf_clearance_value,
-                    user_agent=data.get("user_agent") or "",
-                    browser=data.get("browser") or browser,
-                    proxy=proxy,
-                    expires_at=data.get("expires_at") or 0,
-                    cookie_string=data.get("cookie_string"),
-                    cookies=data.get("cookies")
+                return None
+            
+            data = response.json()
+            
+            if not data.get("success"):
+                error = data.get("error", "Unknown error")
+                logger.error(f"CF Clearance service failed: {error}")
+                return None
+            
+            cf_clearance_value = data.get("cf_clearance") or ""
+            
+            if not cf_clearance_value:
+                challenge_type = data.get("challenge_type", "unknown")
+                logger.warning(
+                    f"CF Clearance not obtained: challenge_type={challenge_type}, "
+                    f"target may not have CF protection"
                 )
-                
-                logger.info(
-                    f"CF Clearance obtained successfully: browser={cache.browser}, "
-                    f"cf_clearance={cache.cf_clearance[:20]}..., "
-                    f"expires_at={cache.expires_at}"
-                )
-                
-                return cache
-                
+                return None
+            
+            cache = CFClearanceCache(
+                cf_clearance=cf_clearance_value,
+                user_agent=data.get("user_agent") or "",
+                browser=data.get("browser") or browser,
+                proxy=proxy,
+                expires_at=data.get("expires_at") or 0,
+                cookie_string=data.get("cookie_string"),
+                cookies=data.get("cookies")
+            )
+            
+            logger.info(
+                f"CF Clearance obtained successfully: browser={cache.browser}, "
+                f"cf_clearance={cache.cf_clearance[:20]}..., "
+                f"expires_at={cache.expires_at}"
+            )
+            
+            return cache
+            
         except httpx.TimeoutException:
             logger.error(f"CF Clearance service request timeout (timeout={timeout}s)")
             return None
@@ -160,35 +251,8 @@ class CFClearanceService:
         proxy: Optional[str] = None,
         force_refresh: bool = False
     ) -> Optional[str]:
-        browser = browser or self._get_browser()
-        proxy = proxy if proxy is not None else self._get_proxy()
-        
-        if not force_refresh:
-            cached = await self._cache_manager.get_cached(browser, proxy)
-            if cached:
-                return cached.cf_clearance
-        
-        if await self._cache_manager.is_refreshing():
-            logger.debug("CF Clearance refresh already in progress, waiting...")
-            import asyncio
-            for _ in range(30):
-                await asyncio.sleep(1)
-                cached = await self._cache_manager.get_cached(browser, proxy)
-                if cached:
-                    return cached.cf_clearance
-                if not await self._cache_manager.is_refreshing():
-                    break
-            return None
-        
-        await self._cache_manager.set_refreshing(True)
-        try:
-            cache = await self.fetch_from_service(browser, proxy)
-            if cache:
-                await self._cache_manager.set_cache(cache)
-                return cache.cf_clearance
-            return None
-        finally:
-            await self._cache_manager.set_refreshing(False)
+        cache = await self.get_cache(browser, proxy, force_refresh)
+        return cache.cf_clearance if cache else None
     
     async def peek_cache(
         self,
@@ -213,27 +277,9 @@ class CFClearanceService:
             if cached:
                 return cached
         
-        if await self._cache_manager.is_refreshing():
-            logger.debug("CF Clearance refresh already in progress, waiting...")
-            import asyncio
-            for _ in range(30):
-                await asyncio.sleep(1)
-                cached = await self._cache_manager.get_cached(browser, proxy)
-                if cached:
-                    return cached
-                if not await self._cache_manager.is_refreshing():
-                    break
-            return None
-        
-        await self._cache_manager.set_refreshing(True)
-        try:
-            cache = await self.fetch_from_service(browser, proxy)
-            if cache:
-                await self._cache_manager.set_cache(cache)
-                return cache
-            return None
-        finally:
-            await self._cache_manager.set_refreshing(False)
+        return await self._cache_manager.get_or_fetch(
+            browser, proxy, lambda: self.fetch_from_service(browser, proxy)
+        )
     
     async def invalidate_cache(self) -> None:
         await self._cache_manager.invalidate()
@@ -7,8 +7,12 @@
 from __future__ import annotations
 
 import asyncio
+import concurrent.futures
 from contextvars import ContextVar
+import os
 import re
+import threading
+import time
 from dataclasses import dataclass, field
 from typing import Any, Optional
 
@@ -17,23 +21,80 @@ from app.core.logger import logger
 
 _CF_CLEARANCE_RE = re.compile(r"(^|;\s*)cf_clearance=[^;]*")
 _REQUEST_CF_BUNDLE: ContextVar["CFCredentialsBundle | None"] = ContextVar("request_cf_bundle", default=None)
-
-
-def _run_coroutine_sync(coro, *, timeout: float = 5.0):
+# 进程级凭证缓存：(过期时间 monotonic, 配置版本, 最近一次成功解析的凭证)
+# 凭证通常数分钟到数小时才变化，TTL 内的请求头构建直接复用；配置变更或失效时提前过期
+# TTL 过小会让后台刷新退化为每秒一次的求解请求，解析时设下限
+_MIN_BUNDLE_TTL = 10.0
+_BUNDLE_TTL = max(_MIN_BUNDLE_TTL, float(os.getenv("CF_CLEARANCE_TTL", "60")))
+# legacy 服务连续失败时后台刷新的最长退避间隔（秒）
+_REFRESH_BACKOFF_MAX = 600.0
+_bundle_cache: "tuple[float, int, CFCredentialsBundle | None]" = (0.0, -1, None)
+_bundle_cache_lock = threading.Lock()
+_bundle_refresh_task: "asyncio.Task | None" = None
+# 应用主事件循环，启动时记录；无事件循环的工作线程把协程投递到主循环执行
+_main_loop: "asyncio.AbstractEventLoop | None" = None
+# 同步桥接共享线程池：事件循环内无法直接 asyncio.run，只能转交给工作线程
+_SYNC_BRIDGE_EXECUTOR = concurrent.futures.ThreadPoolExecutor(
+    max_workers=max(1, int(os.getenv("CF_POOL_SIZE", "2"))),
+    thread_name_prefix="cf-sync",
+)
+# 每个桥接线程持有一个常驻事件循环，避免每次调用都经由 asyncio.run 新建并销毁循环
+_bridge_local = threading.local()
+
+
+def _in_running_loop() -> bool:
     try:
-        loop = asyncio.get_running_loop()
+        asyncio.get_running_loop()
     except RuntimeError:
-        loop = None
+        return False
+    return True
+
 
-    if loop is not None:
-        import concurrent.futures
+def _run_on_bridge_loop(coro):
+    loop = getattr(_bridge_local, "loop", None)
+    if loop is None or loop.is_closed():
+        loop = asyncio.new_event_loop()
+        _bridge_local.loop = loop
+    return loop.run_until_complete(coro)
 
-        with concurrent.futures.ThreadPoolExecutor() as pool:
-            future = pool.submit(asyncio.run, coro)
+
+def _run_coroutine_sync(coro, *, timeout: float = 5.0):
+    if _in_running_loop():
+        future = _SYNC_BRIDGE_EXECUTOR.submit(_run_on_bridge_loop, coro)
+        return future.result(timeout=timeout)
+
+    # 工作线程（如 FastAPI 同步路由的线程池）直接复用主循环，
+    # 不必为一次 await 新建事件循环，且 httpx 连接池等循环绑定资源可继续复用
+    main_loop = _main_loop
+    if main_loop is not None and main_loop.is_running():
+        future = asyncio.run_coroutine_threadsafe(coro, main_loop)
+        try:
             return future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
     return asyncio.run(coro)
 
 
+def _get_fresh_bundle() -> "CFCredentialsBundle | None":
+    expires_at, generation, bundle = _bundle_cache
+    if bundle is not None and generation == config.generation and time.monotonic() < expires_at:
+        return bundle
+    return None
+
+
+def _store_bundle(bundle: "CFCredentialsBundle", generation: int) -> None:
+    """generation 须在开始解析前读取：解析期间配置变更时，旧结果不会被当作新配置下的缓存。"""
+    global _bundle_cache
+    _bundle_cache = (time.monotonic() + _BUNDLE_TTL, generation, bundle)
+
+
+def _clear_bundle_cache() -> None:
+    """凭证已失效（403、手动失效）时连同兜底结果一并丢弃。"""
+    global _bundle_cache
+    _bundle_cache = (0.0, -1, None)
+
+
 def _normalize_cookie_string(cookie_string: Optional[str]) -> str:
     return (cookie_string or "").strip().strip(";").strip()
 
@@ -73,7 +134,7 @@ def _mask_secret(value: Optional[str], *, keep: int = 30) -> Optional[str]:
     return value[:keep] + "..."
 
 
-@dataclass
+@dataclass(slots=True)
 class CFCredentialsBundle:
     source: str = "config"
     cf_clearance: str = ""
@@ -110,28 +171,61 @@ class CFCredentialsFacade:
 
     def __init__(self):
         self._cf_refresh_recovery_task: Optional[asyncio.Task] = None
+        self._legacy_service = None
+        self._config_gen = -1
+        self._config_values: tuple[bool, bool, str, str, str, str] = (False, False, "", "", "", "")
+
+    def _get_legacy_service(self):
+        """首次使用时缓存 legacy 服务句柄；cf_clearance 包会反向导入本模块，不能放在模块顶部导入。"""
+        service = self._legacy_service
+        if service is None:
+            from app.services.cf_clearance import get_cf_clearance_service
+
+            service = self._legacy_service = get_cf_clearance_service()
+        return service
+
+    def _get_config_values(self) -> tuple[bool, bool, str, str, str, str]:
+        """按配置版本缓存 proxy.* 读取结果，配置未变化时无需逐项 get_config。"""
+        if self._config_gen != config.generation:
+            self._config_values = (
+                bool(get_config("proxy.enabled", False)),
+                bool(get_config("proxy.flaresolverr_url") or ""),
+                get_config("proxy.cf_clearance") or "",
+                get_config("proxy.cf_cookies") or "",
+                get_config("proxy.user_agent") or "",
+                get_config("proxy.browser") or "",
+            )
+            self._config_gen = config.generation
+        return self._config_values
 
     def _is_cf_refresh_requested(self) -> bool:
-        return bool(get_config("proxy.enabled", False))
+        return self._get_config_values()[0]
 
     def _has_cf_refresh_solver(self) -> bool:
-        return bool(get_config("proxy.flaresolverr_url") or "")
+        return self._get_config_values()[1]
 
     def _build_config_bundle(self) -> CFCredentialsBundle:
-        cf_refresh_enabled = self._is_cf_refresh_requested()
+        (
+            cf_refresh_enabled,
+            cf_refresh_configured,
+            cf_clearance,
+            cf_cookies,
+            user_agent,
+            browser,
+        ) = self._get_config_values()
         source = "cf_refresh" if cf_refresh_enabled else "config"
         providers = (source,)
         bundle = CFCredentialsBundle(
             source=source,
-            cf_clearance=get_config("proxy.cf_clearance") or "",
-            cf_cookies=get_config("proxy.cf_cookies") or "",
-            user_agent=get_config("proxy.user_agent") or "",
-            browser=get_config("proxy.browser") or "",
+            cf_clearance=cf_clearance,
+            cf_cookies=cf_cookies,
+            user_agent=user_agent,
+            browser=browser,
             cf_refresh_enabled=cf_refresh_enabled,
             providers=providers,
             metadata={
                 "cf_refresh_requested": cf_refresh_enabled,
-                "cf_refresh_configured": self._has_cf_refresh_solver(),
+                "cf_refresh_configured": cf_refresh_configured,
             },
         )
         bundle.metadata["cf_refresh_ready"] = bundle.is_ready
@@ -143,20 +237,19 @@ class CFCredentialsFacade:
         fetch: bool,
         force_refresh: bool = False,
     ) -> CFCredentialsBundle:
-        from app.services.cf_clearance import get_cf_clearance_service
-
-        service = get_cf_clearance_service()
+        service = self._get_legacy_service()
         service_url = service._get_service_url()
+        enabled = bool(service_url)
         bundle = CFCredentialsBundle(
             source="cf_clearance_service",
             service_url=service_url,
-            legacy_service_enabled=service.is_enabled(),
+            legacy_service_enabled=enabled,
             cf_refresh_enabled=self._is_cf_refresh_requested(),
-            providers=(("cf_clearance_service",) if service.is_enabled() else ()),
-            metadata={"legacy_configured": service.is_enabled()},
+            providers=(("cf_clearance_service",) if enabled else ()),
+            metadata={"legacy_configured": enabled},
         )
 
-        if not service.is_enabled():
+        if not enabled:
             bundle.metadata["legacy_ready"] = False
             return bundle
 
@@ -298,6 +391,7 @@ class CFCredentialsFacade:
                 logger.warning(f"Failed to refresh cf_refresh provider: {exc}")
                 cf_refresh_success = False
 
+        generation = config.generation
         config_bundle = self._build_config_bundle()
         legacy_bundle = await self._get_legacy_bundle(fetch=legacy_configured, force_refresh=force and legacy_configured)
         bundle = self._select_active_bundle(config_bundle, legacy_bundle)
@@ -310,14 +404,13 @@ class CFCredentialsFacade:
                 "force": force,
             }
         )
+        _store_bundle(bundle, generation)
         return bundle
 
     async def invalidate_dynamic_state(self, *, clear_cf_refresh_state: bool = False) -> None:
+        _clear_bundle_cache()
         if self.is_legacy_service_enabled():
-            from app.services.cf_clearance import get_cf_clearance_service
-
-            service = get_cf_clearance_service()
-            await service.invalidate_cache()
+            await self._get_legacy_service().invalidate_cache()
 
         if clear_cf_refresh_state and self._is_cf_refresh_requested():
             await config.update({"proxy": {"cf_cookies": "", "cf_clearance": ""}})
@@ -352,9 +445,7 @@ class CFCredentialsFacade:
             self._schedule_cf_refresh_recovery()
 
     def is_legacy_service_enabled(self) -> bool:
-        from app.services.cf_clearance import get_cf_clearance_service
-
-        return get_cf_clearance_service().is_enabled()
+        return self._get_legacy_service().is_enabled()
 
     def has_dynamic_provider(self) -> bool:
         return self._is_cf_refresh_requested() or self.is_legacy_service_enabled()
@@ -375,16 +466,39 @@ def resolve_request_bundle_sync(*, force_refresh: bool = False) -> CFCredentials
     if cached is not None and not force_refresh:
         return cached
 
-    facade = get_cf_credentials_facade()
-    try:
-        bundle = facade.resolve_sync(force_refresh=force_refresh, timeout=15.0)
-    except Exception as exc:
-        logger.debug(f"Failed to resolve active CF bundle: {exc}")
+    if not force_refresh:
+        fresh = _get_fresh_bundle()
+        if fresh is not None:
+            _REQUEST_CF_BUNDLE.set(fresh)
+            return fresh
+
+        # 事件循环内的同步调用不阻塞等待解析：复用同一配置版本下最近一次解析结果，
+        # 否则退回静态配置。兜底结果不写入 ContextVar，以免请求后续的异步构建
+        # 命中它而跳过重新解析
+        if _in_running_loop():
+            _, generation, last = _bundle_cache
+            if last is None or generation != config.generation:
+                return get_cf_credentials_facade()._build_config_bundle()
+            return last
+
+    with _bundle_cache_lock:
+        fresh = None if force_refresh else _get_fresh_bundle()
+        if fresh is not None:
+            _REQUEST_CF_BUNDLE.set(fresh)
+            return fresh
+
+        facade = get_cf_credentials_facade()
+        generation = config.generation
         try:
-            bundle = facade.inspect_sync()
-        except Exception as inner_exc:
-            logger.debug(f"Failed to inspect active CF bundle: {inner_exc}")
-            bundle = CFCredentialsBundle()
+            bundle = facade.resolve_sync(force_refresh=force_refresh, timeout=15.0)
+            _store_bundle(bundle, generation)
+        except Exception as exc:
+            logger.debug(f"Failed to resolve active CF bundle: {exc}")
+            try:
+                bundle = facade.inspect_sync()
+            except Exception as inner_exc:
+                logger.debug(f"Failed to inspect active CF bundle: {inner_exc}")
+                bundle = CFCredentialsBundle()
 
     _REQUEST_CF_BUNDLE.set(bundle)
     return bundle
@@ -395,9 +509,18 @@ async def resolve_request_bundle_async(*, force_refresh: bool = False) -> CFCred
     if cached is not None and not force_refresh:
         return cached
 
+    if not force_refresh:
+        fresh = _get_fresh_bundle()
+        if fresh is not None:
+            _REQUEST_CF_BUNDLE.set(fresh)
+            return fresh
+
+    # 并发未命中时 legacy 服务自身已做单飞刷新，这里无需额外加锁
     facade = get_cf_credentials_facade()
+    generation = config.generation
     try:
         bundle = await facade.resolve(force_refresh=force_refresh)
+        _store_bundle(bundle, generation)
     except Exception as exc:
         logger.debug(f"Failed to async-resolve active CF bundle: {exc}")
         try:
@@ -410,6 +533,51 @@ async def resolve_request_bundle_async(*, force_refresh: bool = False) -> CFCred
     return bundle
 
 
+async def _bundle_refresh_loop() -> None:
+    """后台定期解析凭证，保持进程级缓存常热，请求路径无需等待解析。"""
+    # 在 TTL 过半时刷新，缓存正常情况下不会过期；legacy 服务获取失败时指数退避，
+    # 避免服务不可用（或目标无 CF 保护）时空闲实例也反复触发浏览器求解
+    interval = _BUNDLE_TTL / 2
+    delay = interval
+    facade = get_cf_credentials_facade()
+    while True:
+        failed = False
+        try:
+            generation = config.generation
+            bundle = await facade.resolve()
+            _store_bundle(bundle, generation)
+            failed = bundle.legacy_service_enabled and not bundle.metadata.get("legacy_ready", False)
+        except Exception as exc:
+            logger.debug(f"Background CF bundle refresh failed: {exc}")
+            failed = True
+        if failed:
+            delay = min(delay * 2, _REFRESH_BACKOFF_MAX)
+            logger.debug(f"Background CF bundle refresh not ready, retry in {delay:.0f}s")
+        else:
+            delay = interval
+        await asyncio.sleep(delay)
+
+
+def start_bundle_refresher() -> None:
+    """启动后台凭证刷新任务"""
+    global _bundle_refresh_task, _main_loop
+    if _bundle_refresh_task is not None:
+        return
+    _main_loop = asyncio.get_event_loop()
+    _bundle_refresh_task = _main_loop.create_task(_bundle_refresh_loop())
+    logger.info("CF bundle background refresher started")
+
+
+def stop_bundle_refresher() -> None:
+    """停止后台凭证刷新任务"""
+    global _bundle_refresh_task, _main_loop
+    _main_loop = None
+    if _bundle_refresh_task is not None:
+        _bundle_refresh_task.cancel()
+        _bundle_refresh_task = None
+        logger.info("CF bundle background refresher stopped")
+
+
 def resolve_impersonate_browser(default: Optional[str] = None) -> str:
     bundle = resolve_request_bundle_sync()
     fallback = default if default is not None else (get_config("proxy.browser") or "chrome136")
@@ -423,4 +591,6 @@ __all__ = [
     "resolve_impersonate_browser",
     "resolve_request_bundle_async",
     "resolve_request_bundle_sync",
+    "start_bundle_refresher",
+    "stop_bundle_refresher",
 ]
@@ -12,7 +12,7 @@ from .set_birth import SetBirthReverse
 from .video_upscale import VideoUpscaleReverse
 from .ws_livekit import LivekitTokenReverse, LivekitWebSocketReverse
 from .ws_imagine import ImagineWebSocketReverse
-from .utils.headers import build_headers
+from .utils.headers import build_headers, build_headers_async
 from .utils.statsig import StatsigGenerator
 
 __all__ = [
@@ -31,4 +31,5 @@ __all__ = [
     "ImagineWebSocketReverse",
     "StatsigGenerator",
     "build_headers",
+    "build_headers_async",
 ]
@@ -12,7 +12,7 @@ from app.core.config import get_config
 from app.services.cf_credentials import resolve_impersonate_browser
 from app.core.exceptions import UpstreamException
 from app.services.token.service import TokenService
-from app.services.reverse.utils.headers import build_headers
+from app.services.reverse.utils.headers import build_headers_async
 from app.services.reverse.utils.retry import retry_on_status
 
 CHAT_API = "https://grok.com/rest/app-chat/conversations/new"
@@ -156,7 +156,7 @@ class AppChatReverse:
                 logger.warning("AppChatReverse proxy is empty, request will use direct network")
 
             # Build headers
-            headers = build_headers(
+            headers = await build_headers_async(
                 cookie_token=token,
                 content_type="application/json",
                 origin="https://grok.com",
@@ -172,17 +172,18 @@ class AppChatReverse:
                 tool_overrides=tool_overrides,
                 model_config_override=model_config_override,
             )
-            payload_summary = {
-                "model": payload.get("modelName"),
-                "mode": payload.get("modelMode"),
-                "message_len": payload.get("message") or "",
-                "file_attachments": len(payload.get("fileAttachments") or []),
-                "custom_personality_len": len(payload.get("customPersonality") or ""),
-            }
-            logger.debug(
-                "AppChatReverse final Grok params (redacted)",
-                extra={"grok_payload": payload_summary},
-            )
+            if logger.isEnabledFor("DEBUG"):
+                payload_summary = {
+                    "model": payload.get("modelName"),
+                    "mode": payload.get("modelMode"),
+                    "message_len": payload.get("message") or "",
+                    "file_attachments": len(payload.get("fileAttachments") or []),
+                    "custom_personality_len": len(payload.get("customPersonality") or ""),
+                }
+                logger.debug(
+                    "AppChatReverse final Grok params (redacted)",
+                    extra={"grok_payload": payload_summary},
+                )
 
             # Curl Config
             timeout = float(get_config("chat.timeout") or 0)
@@ -12,7 +12,7 @@ from app.core.config import get_config
 from app.services.cf_credentials import resolve_impersonate_browser
 from app.core.exceptions import UpstreamException
 from app.services.token.service import TokenService
-from app.services.reverse.utils.headers import build_headers
+from app.services.reverse.utils.headers import build_headers_async
 from app.services.reverse.utils.retry import retry_on_status
 
 DOWNLOAD_API = "https://assets.grok.com"
@@ -62,7 +62,7 @@ class AssetsDownloadReverse:
             content_type = _CONTENT_TYPES.get(Path(urllib.parse.urlparse(file_path).path).suffix.lower())
 
             # Build headers
-            headers = build_headers(
+            headers = await build_headers_async(
                 cookie_token=token,
                 content_type=content_type,
                 origin="https://assets.grok.com",
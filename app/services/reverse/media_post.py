@@ -11,7 +11,7 @@ from app.core.config import get_config
 from app.services.cf_credentials import resolve_impersonate_browser
 from app.core.exceptions import UpstreamException
 from app.services.token.service import TokenService
-from app.services.reverse.utils.headers import build_headers
+from app.services.reverse.utils.headers import build_headers_async
 from app.services.reverse.utils.retry import retry_on_status
 
 MEDIA_POST_API = "https://grok.com/rest/media/post/create"
@@ -45,7 +45,7 @@ class MediaPostReverse:
             proxies = {"http": base_proxy, "https": base_proxy} if base_proxy else None
 
             # Build headers
-            headers = build_headers(
+            headers = await build_headers_async(
                 cookie_token=token,
                 content_type="application/json",
                 origin="https://grok.com",
@@ -8,7 +8,7 @@ from app.core.logger import logger
 from app.core.config import get_config
 from app.services.cf_credentials import resolve_impersonate_browser
 from app.core.exceptions import UpstreamException
-from app.services.reverse.utils.headers import build_headers
+from app.services.reverse.utils.headers import build_headers_async
 from app.services.reverse.utils.retry import retry_on_status
 from app.services.reverse.utils.grpc import GrpcClient, GrpcStatus
 
@@ -35,7 +35,7 @@ class NsfwMgmtReverse:
             proxies = {"http": base_proxy, "https": base_proxy} if base_proxy else None
 
             # Build headers
-            headers = build_headers(
+            headers = await build_headers_async(
                 cookie_token=token,
                 origin="https://grok.com",
                 referer="https://grok.com/?_s=data",
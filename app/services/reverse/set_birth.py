@@ -11,7 +11,7 @@ from app.core.logger import logger
 from app.core.config import get_config
 from app.services.cf_credentials import resolve_impersonate_browser
 from app.core.exceptions import UpstreamException
-from app.services.reverse.utils.headers import build_headers
+from app.services.reverse.utils.headers import build_headers_async
 from app.services.reverse.utils.retry import retry_on_status
 
 SET_BIRTH_API = "https://grok.com/rest/auth/set-birth-date"
@@ -37,7 +37,7 @@ class SetBirthReverse:
             proxies = {"http": base_proxy, "https": base_proxy} if base_proxy else None
 
             # Build headers
-            headers = build_headers(
+            headers = await build_headers_async(
                 cookie_token=token,
                 content_type="application/json",
                 origin="https://grok.com",
@@ -1,9 +1,9 @@
 """Shared header builders for reverse interfaces."""
 
+import os
 import re
-import uuid
 import orjson
-from urllib.parse import urlparse
+from functools import lru_cache
 from typing import Dict, Optional
 
 from app.core.logger import logger
@@ -32,6 +32,70 @@ _HEADER_CHAR_REPLACEMENTS = str.maketrans(
     }
 )
 
+_WHITESPACE_RE = re.compile(r"\s+")
+
+_DEFAULT_ORIGIN = "https://grok.com"
+_DEFAULT_REFERER = "https://grok.com/"
+
+# Static request header template. Key order matches the original literal;
+# Origin/Referer/User-Agent are placeholders overwritten per request.
+_BASE_HEADERS: Dict[str, str] = {
+    "Accept-Encoding": "gzip, deflate, br, zstd",
+    "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
+    "Baggage": "sentry-environment=production,sentry-release=d6add6fb0460641fd482d767a335ef72b9b6abb8,sentry-public_key=b311e0f2690c81f25e2c4cf6d4f7ce1c",
+    "Origin": _DEFAULT_ORIGIN,
+    "Priority": "u=1, i",
+    "Referer": _DEFAULT_REFERER,
+    "Sec-Fetch-Mode": "cors",
+    "User-Agent": "",
+}
+
+_BASE_WS_HEADERS: Dict[str, str] = {
+    "Origin": _DEFAULT_ORIGIN,
+    "User-Agent": "",
+    "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
+    "Cache-Control": "no-cache",
+    "Pragma": "no-cache",
+}
+
+
+# Content-Type -> (Content-Type, Accept, Sec-Fetch-Dest); anything else is sent as JSON.
+_DEFAULT_CT_PROFILE = ("application/json", "*/*", "empty")
+_DOCUMENT_ACCEPT = "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7"
+_CT_PROFILES: Dict[Optional[str], tuple[str, str, str]] = {
+    "application/json": _DEFAULT_CT_PROFILE,
+    **{
+        media_type: (media_type, _DOCUMENT_ACCEPT, "document")
+        for media_type in ("image/jpeg", "image/png", "video/mp4", "video/webm")
+    },
+}
+
+_urandom = os.urandom
+
+
+def _new_request_id() -> str:
+    """Random UUIDv4 string built straight from urandom, skipping the UUID object."""
+    raw = bytearray(_urandom(16))
+    raw[6] = (raw[6] & 0x0F) | 0x40  # version 4
+    raw[8] = (raw[8] & 0x3F) | 0x80  # RFC 4122 variant
+    h = raw.hex()
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+
+def _url_hostname(url: str) -> Optional[str]:
+    """Extract the lowercase hostname of an absolute URL with plain string ops."""
+    _, sep, rest = url.partition("://")
+    if not sep:
+        return None
+    for delim in "/?#":
+        rest = rest.split(delim, 1)[0]
+    host = rest.rpartition("@")[2]
+    if host.startswith("["):
+        host = host[1:].partition("]")[0]
+    else:
+        host = host.partition(":")[0]
+    return host.lower() or None
+
 
 def _sanitize_header_value(
     value: Optional[str],
@@ -43,7 +107,7 @@ def _sanitize_header_value(
     raw = "" if value is None else str(value)
     normalized = raw.translate(_HEADER_CHAR_REPLACEMENTS)
     if remove_all_spaces:
-        normalized = re.sub(r"\s+", "", normalized)
+        normalized = _WHITESPACE_RE.sub("", normalized)
     else:
         normalized = normalized.strip()
 
@@ -57,6 +121,18 @@ def _sanitize_header_value(
     return normalized
 
 
+@lru_cache(maxsize=16)
+def _sanitize_user_agent(user_agent: Optional[str]) -> str:
+    """The UA only changes with config/CF credentials, so sanitize (and warn) once per value."""
+    return _sanitize_header_value(user_agent, field_name="proxy.user_agent")
+
+
+@lru_cache(maxsize=64)
+def _sanitize_url_header(value: str, field_name: str) -> str:
+    """Origin/Referer overrides come from a small fixed set; check each value once."""
+    return _sanitize_header_value(value, field_name=field_name)
+
+
 def _get_cf_credentials() -> CFCredentialsBundle:
     try:
         return resolve_request_bundle_sync()
@@ -104,36 +180,77 @@ def _merge_cf_cookie_string(
     return cookie
 
 
-def _build_sso_cookie_from_bundle(sso_token: str, bundle: CFCredentialsBundle) -> str:
-    sso_token = sso_token[4:] if sso_token.startswith("sso=") else sso_token
-    sso_token = _sanitize_header_value(
-        sso_token, field_name="sso_token", remove_all_spaces=True
+@lru_cache(maxsize=8)
+def _cf_cookie_tail(cf_cookies: str, cf_clearance: str) -> str:
+    """Sanitized, merged CF cookie segment; the bundle values repeat across requests."""
+    return _merge_cf_cookie_string(
+        "",
+        cf_cookies=_sanitize_header_value(cf_cookies, field_name="proxy.cf_cookies"),
+        cf_clearance=_sanitize_header_value(
+            cf_clearance, field_name="proxy.cf_clearance", remove_all_spaces=True
+        ),
     )
 
-    cookie = f"sso={sso_token}; sso-rw={sso_token}"
-    cf_cookies = _sanitize_header_value(
-        bundle.cf_cookies or "", field_name="proxy.cf_cookies"
-    )
-    cf_clearance = _sanitize_header_value(
-        bundle.cf_clearance or "",
-        field_name="proxy.cf_clearance",
-        remove_all_spaces=True,
-    )
 
-    return _merge_cf_cookie_string(
-        cookie,
-        cf_cookies=cf_cookies,
-        cf_clearance=cf_clearance,
+_SSO_PREFIX = "sso="
+_CF_CLEARANCE_MARK = "cf_clearance="
+
+
+@lru_cache(maxsize=1024)
+def _sso_cookie_prefix(sso_value: str) -> str:
+    """
+    Sanitized ``sso=...; sso-rw=...`` pair for a token.
+
+    Tokens come from a bounded pool and are reused for many requests, so the
+    translate/encode/whitespace pass runs once per token instead of per call.
+    """
+    sso_value = _sanitize_header_value(
+        sso_value, field_name="sso_token", remove_all_spaces=True
     )
+    return f"sso={sso_value}; sso-rw={sso_value}"
+
+
+def _split_sso_token(sso_token: str) -> tuple[str, str]:
+    """Split a token into the bare SSO value and any cookie segments it already carries."""
+    token = sso_token.removeprefix(_SSO_PREFIX)
+    if _CF_CLEARANCE_MARK not in token:
+        return token, ""
+    value, _, carried = token.partition(";")
+    return value, carried.strip()
+
+
+def _build_sso_cookie(sso_token: str, cf_cookies: str = "", cf_clearance: str = "") -> str:
+    sso_value, carried = _split_sso_token(sso_token)
+    cookie = _sso_cookie_prefix(sso_value)
+    if carried:
+        # Token already ships its own CF cookies; keep them as-is.
+        return cookie + "; " + _sanitize_header_value(carried, field_name="sso_token")
+
+    cf_tail = _cf_cookie_tail(cf_cookies, cf_clearance)
+    if cf_tail:
+        cookie += cf_tail if cookie.endswith(";") else "; " + cf_tail
+    return cookie
+
+
+def _build_sso_cookie_from_bundle(
+    sso_token: str, bundle: Optional[CFCredentialsBundle]
+) -> str:
+    if bundle is None:
+        return _build_sso_cookie(sso_token)
+    return _build_sso_cookie(sso_token, bundle.cf_cookies or "", bundle.cf_clearance or "")
 
 
 def build_sso_cookie(sso_token: str) -> str:
     """Build SSO Cookie string."""
+    if _CF_CLEARANCE_MARK in sso_token:
+        return _build_sso_cookie_from_bundle(sso_token, None)
     return _build_sso_cookie_from_bundle(sso_token, _get_cf_credentials())
 
 
 async def build_sso_cookie_async(sso_token: str) -> str:
     """Build SSO Cookie string with resolved CF credentials."""
+    if _CF_CLEARANCE_MARK in sso_token:
+        return _build_sso_cookie_from_bundle(sso_token, None)
     return _build_sso_cookie_from_bundle(sso_token, await _get_cf_credentials_async())
 
 
@@ -174,7 +291,9 @@ def _detect_arch(user_agent: str) -> Optional[str]:
     return None
 
 
+@lru_cache(maxsize=32)
 def _build_client_hints(browser: Optional[str], user_agent: Optional[str]) -> Dict[str, str]:
+    # Cached per (browser, UA); callers only merge the result, never mutate it.
     browser = (browser or "").strip().lower()
     user_agent = user_agent or ""
     ua = user_agent.lower()
@@ -226,6 +345,31 @@ def _build_client_hints(browser: Optional[str], user_agent: Optional[str]) -> Di
     return hints
 
 
+def _build_ws_headers_from_bundle(
+    bundle: CFCredentialsBundle,
+    token: Optional[str] = None,
+    origin: Optional[str] = None,
+    extra: Optional[Dict[str, str]] = None,
+) -> Dict[str, str]:
+    user_agent = _sanitize_user_agent(bundle.user_agent)
+    headers = _BASE_WS_HEADERS.copy()
+    if origin:
+        headers["Origin"] = _sanitize_url_header(origin, "origin")
+    headers["User-Agent"] = user_agent
+
+    client_hints = _build_client_hints(bundle.browser, user_agent)
+    if client_hints:
+        headers.update(client_hints)
+
+    if token:
+        headers["Cookie"] = _build_sso_cookie_from_bundle(token, bundle)
+
+    if extra:
+        headers.update(extra)
+
+    return headers
+
+
 def build_ws_headers(token: Optional[str] = None, origin: Optional[str] = None, extra: Optional[Dict[str, str]] = None) -> Dict[str, str]:
     """
     Build headers for WebSocket requests.
@@ -238,103 +382,127 @@ def build_ws_headers(token: Optional[str] = None, origin: Optional[str] = None,
     Returns:
         Dict[str, str]: The headers dictionary.
     """
-    bundle = _get_cf_credentials()
-    user_agent = _sanitize_header_value(
-        bundle.user_agent, field_name="proxy.user_agent"
-    )
-    safe_origin = _sanitize_header_value(origin or "https://grok.com", field_name="origin")
-    headers = {
-        "Origin": safe_origin,
-        "User-Agent": user_agent,
-        "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
-        "Cache-Control": "no-cache",
-        "Pragma": "no-cache",
-    }
-
-    client_hints = _build_client_hints(bundle.browser, user_agent)
-    if client_hints:
-        headers.update(client_hints)
-
-    if token:
-        headers["Cookie"] = _build_sso_cookie_from_bundle(token, bundle)
-
-    if extra:
-        headers.update(extra)
+    return _build_ws_headers_from_bundle(_get_cf_credentials(), token, origin, extra)
 
-    return headers
 
-def build_headers(cookie_token: str, content_type: Optional[str] = None, origin: Optional[str] = None, referer: Optional[str] = None) -> Dict[str, str]:
+async def build_ws_headers_async(token: Optional[str] = None, origin: Optional[str] = None, extra: Optional[Dict[str, str]] = None) -> Dict[str, str]:
     """
-    Build headers for reverse interfaces.
+    Build headers for WebSocket requests with resolved CF credentials.
 
     Args:
-        cookie_token: str, the SSO token.
-        content_type: Optional[str], the Content-Type value.
+        token: Optional[str], the SSO token for Cookie. Defaults to None.
         origin: Optional[str], the Origin value. Defaults to "https://grok.com" if not provided.
-        referer: Optional[str], the Referer value. Defaults to "https://grok.com/" if not provided.
+        extra: Optional[Dict[str, str]], extra headers to merge. Defaults to None.
 
     Returns:
         Dict[str, str]: The headers dictionary.
     """
-    bundle = _get_cf_credentials()
-    user_agent = _sanitize_header_value(
-        bundle.user_agent, field_name="proxy.user_agent"
-    )
-    safe_origin = _sanitize_header_value(origin or "https://grok.com", field_name="origin")
-    safe_referer = _sanitize_header_value(
-        referer or "https://grok.com/", field_name="referer"
-    )
-    headers = {
-        "Accept-Encoding": "gzip, deflate, br, zstd",
-        "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
-        "Baggage": "sentry-environment=production,sentry-release=d6add6fb0460641fd482d767a335ef72b9b6abb8,sentry-public_key=b311e0f2690c81f25e2c4cf6d4f7ce1c",
-        "Origin": safe_origin,
-        "Priority": "u=1, i",
-        "Referer": safe_referer,
-        "Sec-Fetch-Mode": "cors",
-        "User-Agent": user_agent,
-    }
+    return _build_ws_headers_from_bundle(await _get_cf_credentials_async(), token, origin, extra)
+
+
+# Per-request keys, in the order they follow the static headers and client hints.
+_DYNAMIC_HEADER_KEYS = (
+    "Cookie",
+    "Content-Type",
+    "Accept",
+    "Sec-Fetch-Dest",
+    "Sec-Fetch-Site",
+    "x-statsig-id",
+    "x-xai-request-id",
+)
 
-    client_hints = _build_client_hints(bundle.browser, user_agent)
-    if client_hints:
-        headers.update(client_hints)
 
-    headers["Cookie"] = _build_sso_cookie_from_bundle(cookie_token, bundle)
+@lru_cache(maxsize=16)
+def _headers_template(browser: Optional[str], user_agent: str) -> Dict[str, str]:
+    """
+    Full header layout for a (browser, UA) pair with placeholders for per-request keys.
 
-    if content_type and content_type == "application/json":
-        headers["Content-Type"] = "application/json"
-        headers["Accept"] = "*/*"
-        headers["Sec-Fetch-Dest"] = "empty"
-    elif content_type in ["image/jpeg", "image/png", "video/mp4", "video/webm"]:
-        headers["Content-Type"] = content_type
-        headers["Accept"] = "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7"
-        headers["Sec-Fetch-Dest"] = "document"
-    else:
-        headers["Content-Type"] = "application/json"
-        headers["Accept"] = "*/*"
-        headers["Sec-Fetch-Dest"] = "empty"
+    Copying a dict that already holds every key gives a correctly sized table,
+    so per-request assignments overwrite in place instead of growing the dict.
+    Callers must copy the result before mutating it.
+    """
+    template = {
+        **_BASE_HEADERS,
+        "User-Agent": user_agent,
+        **_build_client_hints(browser, user_agent),
+    }
+    template.update(dict.fromkeys(_DYNAMIC_HEADER_KEYS, ""))
+    return template
+
+
+@lru_cache(maxsize=1024)
+def _stable_headers(
+    cookie_token: str,
+    content_type: Optional[str],
+    origin: Optional[str],
+    referer: Optional[str],
+    browser: str,
+    user_agent: str,
+    cf_cookies: str,
+    cf_clearance: str,
+) -> Dict[str, str]:
+    """
+    Everything except the per-request random ids, cached per argument tuple.
 
-    origin_domain = urlparse(headers.get("Origin", "")).hostname
-    referer_domain = urlparse(headers.get("Referer", "")).hostname
+    Streaming sessions rebuild headers for the same token and CF credentials
+    back-to-back, so only x-statsig-id / x-xai-request-id need fresh values.
+    Callers must copy the result before mutating it.
+    """
+    user_agent = _sanitize_user_agent(user_agent)
+    headers = _headers_template(browser, user_agent).copy()
+    if origin:
+        headers["Origin"] = _sanitize_url_header(origin, "origin")
+    if referer:
+        headers["Referer"] = _sanitize_url_header(referer, "referer")
+
+    headers["Cookie"] = _build_sso_cookie(cookie_token, cf_cookies, cf_clearance)
+
+    ct, accept, dest = _CT_PROFILES.get(content_type, _DEFAULT_CT_PROFILE)
+    headers["Content-Type"] = ct
+    headers["Accept"] = accept
+    headers["Sec-Fetch-Dest"] = dest
+
+    origin_domain = _url_hostname(headers["Origin"])
+    referer_domain = _url_hostname(headers["Referer"])
     if origin_domain and referer_domain and origin_domain == referer_domain:
         headers["Sec-Fetch-Site"] = "same-origin"
     else:
         headers["Sec-Fetch-Site"] = "same-site"
+    return headers
 
+
+def _build_headers_from_bundle(
+    bundle: CFCredentialsBundle,
+    cookie_token: str,
+    content_type: Optional[str] = None,
+    origin: Optional[str] = None,
+    referer: Optional[str] = None,
+) -> Dict[str, str]:
+    headers = _stable_headers(
+        cookie_token,
+        content_type,
+        origin,
+        referer,
+        bundle.browser,
+        bundle.user_agent,
+        bundle.cf_cookies or "",
+        bundle.cf_clearance or "",
+    ).copy()
     headers["x-statsig-id"] = StatsigGenerator.gen_id()
-    headers["x-xai-request-id"] = str(uuid.uuid4())
+    headers["x-xai-request-id"] = _new_request_id()
 
-    safe_headers = dict(headers)
-    if "Cookie" in safe_headers:
-        safe_headers["Cookie"] = "<redacted>"
-    logger.debug(f"Built headers: {orjson.dumps(safe_headers).decode()}")
+    # Serialize only when DEBUG output is actually emitted
+    logger.opt(lazy=True).debug(
+        "Built headers: {}",
+        lambda: orjson.dumps({**headers, "Cookie": "<redacted>"}).decode(),
+    )
 
     return headers
 
 
-async def build_headers_async(cookie_token: str, content_type: Optional[str] = None, origin: Optional[str] = None, referer: Optional[str] = None) -> Dict[str, str]:
+def build_headers(cookie_token: str, content_type: Optional[str] = None, origin: Optional[str] = None, referer: Optional[str] = None) -> Dict[str, str]:
     """
-    Build headers for reverse interfaces with resolved CF credentials.
+    Build headers for reverse interfaces.
 
     Args:
         cookie_token: str, the SSO token.
@@ -345,60 +513,34 @@ async def build_headers_async(cookie_token: str, content_type: Optional[str] = N
     Returns:
         Dict[str, str]: The headers dictionary.
     """
-    bundle = await _get_cf_credentials_async()
-    user_agent = _sanitize_header_value(
-        bundle.user_agent, field_name="proxy.user_agent"
+    return _build_headers_from_bundle(
+        _get_cf_credentials(), cookie_token, content_type, origin, referer
     )
-    safe_origin = _sanitize_header_value(origin or "https://grok.com", field_name="origin")
-    safe_referer = _sanitize_header_value(
-        referer or "https://grok.com/", field_name="referer"
-    )
-    headers = {
-        "Accept-Encoding": "gzip, deflate, br, zstd",
-        "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
-        "Baggage": "sentry-environment=production,sentry-release=d6add6fb0460641fd482d767a335ef72b9b6abb8,sentry-public_key=b311e0f2690c81f25e2c4cf6d4f7ce1c",
-        "Origin": safe_origin,
-        "Priority": "u=1, i",
-        "Referer": safe_referer,
-        "Sec-Fetch-Mode": "cors",
-        "User-Agent": user_agent,
-    }
-
-    client_hints = _build_client_hints(bundle.browser, user_agent)
-    if client_hints:
-        headers.update(client_hints)
 
-    headers["Cookie"] = _build_sso_cookie_from_bundle(cookie_token, bundle)
-
-    if content_type and content_type == "application/json":
-        headers["Content-Type"] = "application/json"
-        headers["Accept"] = "*/*"
-        headers["Sec-Fetch-Dest"] = "empty"
-    elif content_type in ["image/jpeg", "image/png", "video/mp4", "video/webm"]:
-        headers["Content-Type"] = content_type
-        headers["Accept"] = "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7"
-        headers["Sec-Fetch-Dest"] = "document"
-    else:
-        headers["Content-Type"] = "application/json"
-        headers["Accept"] = "*/*"
-        headers["Sec-Fetch-Dest"] = "empty"
-
-    origin_domain = urlparse(headers.get("Origin", "")).hostname
-    referer_domain = urlparse(headers.get("Referer", "")).hostname
-    if origin_domain and referer_domain and origin_domain == referer_domain:
-        headers["Sec-Fetch-Site"] = "same-origin"
-    else:
-        headers["Sec-Fetch-Site"] = "same-site"
 
-    headers["x-statsig-id"] = StatsigGenerator.gen_id()
-    headers["x-xai-request-id"] = str(uuid.uuid4())
+async def build_headers_async(cookie_token: str, content_type: Optional[str] = None, origin: Optional[str] = None, referer: Optional[str] = None) -> Dict[str, str]:
+    """
+    Build headers for reverse interfaces with resolved CF credentials.
 
-    safe_headers = dict(headers)
-    if "Cookie" in safe_headers:
-        safe_headers["Cookie"] = "<redacted>"
-    logger.debug(f"Built headers: {orjson.dumps(safe_headers).decode()}")
+    Args:
+        cookie_token: str, the SSO token.
+        content_type: Optional[str], the Content-Type value.
+        origin: Optional[str], the Origin value. Defaults to "https://grok.com" if not provided.
+        referer: Optional[str], the Referer value. Defaults to "https://grok.com/" if not provided.
 
-    return headers
+    Returns:
+        Dict[str, str]: The headers dictionary.
+    """
+    return _build_headers_from_bundle(
+        await _get_cf_credentials_async(), cookie_token, content_type, origin, referer
+    )
 
 
-__all__ = ["build_headers", "build_headers_async", "build_sso_cookie", "build_sso_cookie_async", "build_ws_headers"]
+__all__ = [
+    "build_headers",
+    "build_headers_async",
+    "build_sso_cookie",
+    "build_sso_cookie_async",
+    "build_ws_headers",
+    "build_ws_headers_async",
+]
@@ -7,7 +7,23 @@ import random
 import string
 
 from app.core.logger import logger
-from app.core.config import get_config
+from app.core.config import config, get_config
+
+_STATIC_ID = "ZTpUeXBlRXJyb3I6IENhbm5vdCByZWFkIHByb3BlcnRpZXMgb2YgdW5kZWZpbmVkIChyZWFkaW5nICdjaGlsZE5vZGVzJyk="
+_LOWER_CHARS = string.ascii_lowercase
+_ALNUM_CHARS = string.ascii_lowercase + string.digits
+
+# (config generation, app.dynamic_statsig) - re-read only after a config reload
+_dynamic_flag: tuple[int, bool] = (-1, False)
+
+
+def _is_dynamic() -> bool:
+    global _dynamic_flag
+    generation, dynamic = _dynamic_flag
+    if generation != config.generation:
+        dynamic = bool(get_config("app.dynamic_statsig"))
+        _dynamic_flag = (config.generation, dynamic)
+    return dynamic
 
 
 class StatsigGenerator:
@@ -16,11 +32,7 @@ class StatsigGenerator:
     @staticmethod
     def _rand(length: int, alphanumeric: bool = False) -> str:
         """Generate random string."""
-        chars = (
-            string.ascii_lowercase + string.digits
-            if alphanumeric
-            else string.ascii_lowercase
-        )
+        chars = _ALNUM_CHARS if alphanumeric else _LOWER_CHARS
         return "".join(random.choices(chars, k=length))
 
     @staticmethod
@@ -31,13 +43,11 @@ class StatsigGenerator:
         Returns:
             Base64 encoded ID.
         """
-        dynamic = get_config("app.dynamic_statsig")
-
-        # Dynamic Statsig ID
-        if dynamic:
+        # Dynamic Statsig ID: must stay unique per request, so it is never cached
+        if _is_dynamic():
             logger.debug("Generating dynamic Statsig ID")
             
-            if random.choice([True, False]):
+            if random.getrandbits(1):
                 rand = StatsigGenerator._rand(5, alphanumeric=True)
                 message = f"e:TypeError: Cannot read properties of null (reading 'children['{rand}']')"
             else:
@@ -50,7 +60,7 @@ class StatsigGenerator:
 
         # Static Statsig ID
         logger.debug("Generating static Statsig ID")
-        return "ZTpUeXBlRXJyb3I6IENhbm5vdCByZWFkIHByb3BlcnRpZXMgb2YgdW5kZWZpbmVkIChyZWFkaW5nICdjaGlsZE5vZGVzJyk="
+        return _STATIC_ID
 
 
 __all__ = ["StatsigGenerator"]
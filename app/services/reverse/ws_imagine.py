@@ -13,7 +13,7 @@ import aiohttp
 
 from app.core.config import get_config
 from app.core.logger import logger
-from app.services.reverse.utils.headers import build_ws_headers
+from app.services.reverse.utils.headers import build_ws_headers_async
 from app.services.reverse.utils.websocket import WebSocketClient
 
 WS_IMAGINE_URL = "wss://grok.com/ws/imagine/listen"
@@ -177,7 +177,7 @@ class ImagineWebSocketReverse:
         enable_nsfw: bool,
     ) -> AsyncGenerator[Dict[str, object], None]:
         request_id = str(uuid.uuid4())
-        headers = build_ws_headers(token=token)
+        headers = await build_ws_headers_async(token=token)
         timeout = float(get_config("image.timeout"))
         stream_timeout = float(get_config("image.stream_timeout"))
         final_timeout = float(get_config("image.final_timeout"))
@@ -12,7 +12,7 @@ from app.core.config import get_config
 from app.services.cf_credentials import resolve_impersonate_browser
 from app.core.exceptions import UpstreamException
 from app.services.token.service import TokenService
-from app.services.reverse.utils.headers import build_headers, build_ws_headers
+from app.services.reverse.utils.headers import build_headers_async, build_ws_headers_async
 from app.services.reverse.utils.retry import retry_on_status
 from app.services.reverse.utils.websocket import WebSocketClient, WebSocketConnection
 
@@ -49,7 +49,7 @@ class LivekitTokenReverse:
             proxies = {"http": base_proxy, "https": base_proxy} if base_proxy else None
 
             # Build headers
-            headers = build_headers(
+            headers = await build_headers_async(
                 cookie_token=token,
                 content_type="application/json",
                 origin="https://grok.com",
@@ -162,7 +162,7 @@ class LivekitWebSocketReverse:
         url = f"{base}?{urlencode(params)}"
 
         # Build WebSocket headers
-        ws_headers = build_ws_headers()
+        ws_headers = await build_ws_headers_async()
 
         try:
             return await self._client.connect(
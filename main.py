@@ -117,6 +117,10 @@ async def lifespan(app: FastAPI):
     from app.services.cf_refresh import start as cf_refresh_start
     cf_refresh_start()
 
+    # 8. 启动 CF 凭证后台刷新，请求路径只读取进程级缓存
+    from app.services.cf_credentials import start_bundle_refresher
+    start_bundle_refresher()
+
     logger.info("Application startup complete.")
     yield
 
@@ -126,6 +130,13 @@ async def lifespan(app: FastAPI):
     from app.services.cf_refresh import stop as cf_refresh_stop
     cf_refresh_stop()
 
+    from app.services.cf_credentials import stop_bundle_refresher
+    stop_bundle_refresher()
+
+    from app.services.cf_clearance import get_cf_clearance_service
+
+    await get_cf_clearance_service().aclose()
+
     from app.core.storage import StorageFactory
 
     if StorageFactory._instance: